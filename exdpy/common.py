@@ -1,55 +1,86 @@
 from typing import Text, Union, Generic, NamedTuple, TypeVar, List, Optional, Mapping, TypedDict
 from enum import Enum
-from datetime import datetime
+from datetime import datetime, timezone
+from functools import lru_cache
 import re
-
-_REGEX_NAME = re.compile(r'^[a-zA-Z0-9_]+$')
-_REGEX_APIKEY = re.compile(r'^[A-Za-z0-9\-_]+$')
+import sys
+import requests
+from requests.adapters import HTTPAdapter
+import json
+try:
+    # orjson parses faster than the standard library, if installed
+    from orjson import loads as _orjson_loads, JSONDecodeError as _OrjsonDecodeError
+
+    def _json_loads(text):
+        try:
+            return _orjson_loads(text)
+        except _OrjsonDecodeError:
+            # NaN, Infinity and lone surrogates are rejected by orjson, but accepted by the standard library
+            return json.loads(text)
+except ImportError:
+    from json import loads as _json_loads
+
+from .constants import CONNECTION_POOL_SIZE
+
+_REGEX_NAME = re.compile(r'[a-zA-Z0-9_]+')
+_REGEX_APIKEY = re.compile(r'[A-Za-z0-9\-_]+')
+# fullmatch, unlike $ anchor, does not accept a trailing newline
+_match_name = _REGEX_NAME.fullmatch
+_match_apikey = _REGEX_APIKEY.fullmatch
 
 APIKey = Text
 
+# fromisoformat accepts Z as UTC timezone since python 3.11
+_PY311 = sys.version_info >= (3, 11)
+
+@lru_cache(maxsize=128)
+def _parse_iso(text: Text) -> datetime:
+    if not _PY311:
+        # Z indicating UTC timezone is not supported by fromisoformat
+        # however, +00:00 is supported
+        text = text.replace('Z', '+00:00')
+    return datetime.fromisoformat(text)
+
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def _convert_datetime_to_nanosec(dt: datetime) -> int:
+    if dt.tzinfo is None:
+        # naive datetime is in local time, as with datetime.timestamp()
+        dt = dt.astimezone(timezone.utc)
+    # integer arithmetic on the fields, float timestamp would lose precision
+    delta = dt - _EPOCH_UTC
+    return delta.days * 86_400_000_000_000 + delta.seconds * 1_000_000_000 + delta.microseconds * 1_000
+
 AnyDateTime = Union[int, Text, datetime]
 
 def _convert_any_date_time_to_nanosec(any_date_time: AnyDateTime) -> int:
-    if isinstance(any_date_time, int):
+    # exact type check is faster and does not accept bool
+    if type(any_date_time) is int:
         # already in nanosec
         return any_date_time
     elif isinstance(any_date_time, str):
-        # Z indicating UTC timezone is not supported by fromisoformat
-        # however, +00:00 is supported
-        any_date_time = any_date_time.replace('Z', '+00:00')
         # convert it to datetime using iso format
-        any_date_time = datetime.fromisoformat(any_date_time)
+        any_date_time = _parse_iso(any_date_time)
     
     if isinstance(any_date_time, datetime):
-        timestamp = any_date_time.timestamp()
-        # split timestamp in seconds in float into seconds part and under seconds part
-        # this is to prevent precision issue
-        seconds = int(timestamp)
-        nanosecs = int((timestamp - seconds) * 1_000_000_000)
-
-        return seconds * 1_000_000_000 + nanosecs
+        return _convert_datetime_to_nanosec(any_date_time)
     else:
-        raise TypeError('type "%s" is not supported for AnyDateTime', type(any_date_time))
+        raise TypeError('type "%s" is not supported for AnyDateTime' % type(any_date_time))
 
 AnyMinute = Union[int, Text, datetime]
 
 def _convert_any_minute_to_minute(any_minute: AnyMinute) -> int:
-    if isinstance(any_minute, int):
+    if type(any_minute) is int:
         # already in minute
         return any_minute
     elif isinstance(any_minute, str):
         # convert it to datetime using iso format
-        any_minute = any_minute.replace('Z', '+00:00')
-        any_minute = datetime.fromisoformat(any_minute)
+        any_minute = _parse_iso(any_minute)
 
     if isinstance(any_minute, datetime):
-        timestamp = any_minute.timestamp()
-
-        # convert seconds to minutes
-        return int(timestamp / 60)
+        return _convert_nanosec_to_minute(_convert_datetime_to_nanosec(any_minute))
     else:
-        raise TypeError('type "%s" is not supported for AnyMinute', type(any_minute))
+        raise TypeError('type "%s" is not supported for AnyMinute' % type(any_minute))
 
 def _convert_nanosec_to_minute(nanosec: int) -> int:
     return nanosec // 60_000_000_000
@@ -160,32 +191,46 @@ def _check_filter(filter: Filter, argname: Text):
     for (exchange, channels) in filter.items():
         if not isinstance(exchange, str):
             raise TypeError('%s: Name of exchange must be an string', argname)
-        if not _REGEX_NAME.match(exchange):
+        if not _match_name(exchange):
             raise ValueError('%s: Name of exchange must be an valid string: %s' % (argname, exchange))
         for ch in channels:
             if not isinstance(ch, str):
                 raise TypeError('%s: Name of channel must be an string' % argname)
-            if not _REGEX_NAME.match(ch):
+            if not _match_name(ch):
                 raise ValueError('%s: Name of channel must be an valid string: %s' % (argname, ch))
 
 class _ClientSetting(TypedDict):
     """Settings for :class:`Client`"""
     apikey: APIKey
     timeout: float
+    session: requests.Session
 
 def _setup_client_setting(apikey: Text, timeout: float) -> _ClientSetting:
     if apikey is None:
         raise TypeError('parameter "apikey" must be specified')
     if not isinstance(apikey, str):
         raise TypeError('parameter "apikey" must be an string')
-    if not _REGEX_APIKEY.match(apikey):
+    if not _match_apikey(apikey):
         raise ValueError('parameter "apikey" must be an valid API-key')
-    if not isinstance(timeout, float):
-        raise TypeError('parameter "timeout" must be an float')
+    if isinstance(timeout, bool) or not isinstance(timeout, (int, float)):
+        raise TypeError('parameter "timeout" must be an float or int')
+    timeout = float(timeout)
     if timeout < 0:
         raise ValueError('parameter "timeout" must not be negative')
 
     return {
         'apikey': apikey,
         'timeout': timeout,
+        'session': _setup_session(apikey),
     }
+
+def _setup_session(apikey: APIKey) -> requests.Session:
+    """Session reuses connections to HTTP Endpoint between requests."""
+    session = requests.Session()
+    session.headers['Authorization'] = 'Bearer %s' % apikey
+    # keep enough connections alive for concurrent downloads
+    # requests over the pool size wait for a connection, rather than opening one that is discarded after use
+    adapter = HTTPAdapter(pool_maxsize=CONNECTION_POOL_SIZE, pool_block=True)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
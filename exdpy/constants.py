@@ -1,5 +1,6 @@
 URL_API = 'https://api.exchangedataset.cc/v1/'
 DEFAULT_BUFFER_SIZE = 20
 DOWNLOAD_CONCURRENCY = 20
+CONNECTION_POOL_SIZE = 64
 CLIENT_DEFAULT_TIMEOUT = 30.0
 SNAPSHOT_TOPIC_SUBSCRIBED = '!subscribed'
@@ -1,39 +1,56 @@
-from typing import Text, Mapping, TypedDict, List, Generic, TypeVar, Union, NamedTuple, Optional, MutableMapping, Any
+from typing import Text, Mapping, TypedDict, List, Generic, TypeVar, Union, NamedTuple, Optional, MutableMapping, Any, IO, Iterable, Iterator, Generator, Callable
 from enum import Enum
 import requests
-import gzip
+import io
+from functools import partial
+try:
+    # ISA-L decompresses gzip faster than zlib, if installed
+    from isal import igzip as gzip
+except ImportError:
+    import gzip
 import json
 import re
 
 from .constants import URL_API, CLIENT_DEFAULT_TIMEOUT
-from .common import AnyDateTime, AnyMinute, Shard, TextLine, LineType, APIKey, _ClientSetting, _setup_client_setting, _LineTypeValueOf, _REGEX_NAME, _convert_any_date_time_to_nanosec, _convert_any_minute_to_minute
+from .common import AnyDateTime, AnyMinute, Shard, TextLine, LineType, APIKey, _ClientSetting, _setup_client_setting, _match_name, _json_loads, _convert_any_date_time_to_nanosec, _convert_any_minute_to_minute
+
+def _read_lines(req: requests.Response, stream: IO[bytes]) -> Generator[Text, None, None]:
+    """Internal function to read a response line by line while it is being downloaded.
+
+    Connection is released after the last line was read.
+    """
+    with req:
+        for line in io.TextIOWrapper(stream, encoding='utf-8', newline='\n'):
+            # remove line terminator
+            yield line.rstrip('\n')
 
 def _download(client_setting: _ClientSetting, path: Text, params: Mapping[Text, Any]) -> Mapping:
     """Internal function to download from HTTP Endpoint.
 
+    Body of a response is not buffered, it is returned as an iterator of lines
+    that reads the response as it goes.
+
     :param path: Path to resource.
     :param params: Query parameters.
     """
 
-    req = requests.get(URL_API + path,
+    req = client_setting['session'].get(URL_API + path,
         params=params,
-        headers={
-            'Authorization': 'Bearer %s' % client_setting['apikey'],
-        },
         timeout=client_setting['timeout'],
+        stream=True,
     )
 
     # check status code for any error
     if req.status_code != 200 and req.status_code != 404:
         error = None
         try:
-            obj = req.json()
+            obj = _json_loads(req.content)
             if 'error' in obj:
-                error = obj.error
+                error = obj['error']
             elif 'message' in obj:
-                error = obj.message
+                error = obj['message']
             elif 'Message' in obj:
-                error = obj.Message
+                error = obj['Message']
         except:
             error = req.text
         raise RuntimeError('%s: Request failed: %d %s' % (path, req.status_code, error))
@@ -41,36 +58,50 @@ def _download(client_setting: _ClientSetting, path: Text, params: Mapping[Text,
     # check content-type header
     content_type = req.headers['content-type']
     if content_type != 'text/plain':
+        req.close()
         raise RuntimeError('Invalid response content-type, expected: \'text/plain\' got: \'%s\'' % content_type)
 
+    if req.status_code == 404:
+        # body is not needed, but read it to the end so the connection is returned to the pool
+        req.content
+        req.close()
+        return {
+            'status_code': req.status_code,
+            # empty generator, can be closed as lines of other responses
+            'lines': (line for line in ()),
+        }
+
+    # raw stream is not decoded by requests
+    # keep it open after the last byte, or TextIOWrapper fails to see the end of it
+    req.raw.auto_close = False
+    stream: IO[bytes] = req.raw
     if 'content-encoding' in req.headers:
         # content is possibly compressed
         content_encoding = req.headers['content-encoding']
 
         if content_encoding != 'gzip':
-            raise RuntimeError('Found \'%s\' in Content-Encoding header, but it is not supported', content_encoding)
+            req.close()
+            raise RuntimeError('Found \'%s\' in Content-Encoding header, but it is not supported' % content_encoding)
 
-        return {
-            'status_code': req.status_code,
-            'body': gzip.decompress(req.content),
-        }
+        # decompress as it is read
+        stream = gzip.GzipFile(fileobj=req.raw)
 
     return {
         'status_code': req.status_code,
-        'body': req.text,
+        'lines': _read_lines(req, stream),
     }
 
 def _check_param_exchange(exchange: Text):
     if not isinstance(exchange, str):
         raise TypeError('Parameter "exchange" must be a string')
-    if not _REGEX_NAME.match(exchange):
+    if not _match_name(exchange):
         raise ValueError('Parameter "exchange" must be an valid string')
 
 def _check_param_channels(channels: List[Text]):
     if not isinstance(channels, list):
         raise TypeError('Parameter "channels" must be an list')
     for ch in channels:
-        if not _REGEX_NAME.match(ch):
+        if not _match_name(ch):
             raise ValueError('Parameter "channels" must be an valid string: "%s"' % ch)
 
 def _filter(
@@ -81,11 +112,16 @@ def _filter(
     formt: Optional[Text],
     start: Optional[AnyDateTime],
     end: Optional[AnyDateTime],
+    validate: bool = True,
 ) -> Shard:
-    """Internal function to call Filter HTTP Endpoint."""
-    # check parameters
-    _check_param_exchange(exchange)
-    _check_param_channels(channels)
+    """Internal function to call Filter HTTP Endpoint.
+
+    Parameters are not checked if `validate` is `False`, for callers which already did.
+    """
+    if validate:
+        # check parameters
+        _check_param_exchange(exchange)
+        _check_param_channels(channels)
 
     # convert any minute into minutes, this will type check "minute"
     minute_minute = _convert_any_minute_to_minute(minute)
@@ -101,76 +137,71 @@ def _filter(
     if end is not None:
         end_nanosec = _convert_any_date_time_to_nanosec(end)
         query['end'] = end_nanosec
-    if start is not None and end is not None:
+    if validate and start is not None and end is not None:
         # check if start < end
         if query['start'] >= query['end']:
             raise ValueError('"start" cannot be equal to or bigger than "end"')
     if formt is not None:
-        if not isinstance(formt, str):
-            raise TypeError('Parameter "format" must be a string')
-        if not _REGEX_NAME.match(formt):
-            raise ValueError('Parameter "format" must be an valid string')
+        if validate:
+            if not isinstance(formt, str):
+                raise TypeError('Parameter "format" must be a string')
+            if not _match_name(formt):
+                raise ValueError('Parameter "format" must be an valid string')
         query['format'] = formt
 
     # download from HTTP Endpoint
-    res = _download(client_setting, 'filter/%s/%d' % (exchange, minute_minute), query)
+    res = _download(client_setting, f'filter/{exchange}/{minute_minute}', query)
 
     if res['status_code'] == 404:
         # 404, return empty list
         return list()
 
-    # convert into line objects
-    body: str = res['body']
-
-    # split by line terminator
-    lines = body.splitlines(False)
-    # prepare list to store result
-    result: List = [None] * len(lines)
-    # convert lines
-    for i in range(len(lines)):
-        l = lines[i]
-        lineTypeStr = l[:l.find('\t')]
-
-        if lineTypeStr not in _LineTypeValueOf:
-            raise RuntimeError('Unknown line type: %s' % lineTypeStr)
-
-        lineType = _LineTypeValueOf[lineTypeStr]
-
-        # exchange: Text
-        ## type: LineType
-        # timestamp: int
-        # channel: Text
-        # message: Text
-
-        if lineType == LineType.MESSAGE or lineType == LineType.SEND:
-            split = l.split('\t', 4)
-            result[i] = TextLine(
-                exchange,
-                _LineTypeValueOf[split[0]],
-                int(split[1]),
-                split[2],
-                split[3],
-            )
-        elif lineType == LineType.START or lineType == LineType.END:
-            split = l.split('\t', 3)
-            result[i] = TextLine(
-                exchange,
-                _LineTypeValueOf[split[0]],
-                int(split[1]),
-                split[2],
-                None,
-            )
-        elif lineType == LineType.ERROR:
-            split = l.split('\t', 2)
-            result[i] = TextLine(
-                exchange,
-                _LineTypeValueOf[split[0]],
-                int(split[1]),
-                None,
-                None,
-            )
-
-    return result
+    lines = res['lines']
+    try:
+        return _parse_filter_lines(lines, exchange)
+    finally:
+        # release the connection even if lines were not read to the end
+        lines.close()
+
+# exchange: Text
+## type: LineType
+# timestamp: int
+# channel: Text
+# message: Text
+
+def _make_line_with_message(line_type: LineType, exchange: Text, split: List[Text]) -> TextLine:
+    return TextLine(exchange, line_type, int(split[1]), split[2], split[3])
+
+def _make_line_with_channel(line_type: LineType, exchange: Text, split: List[Text]) -> TextLine:
+    return TextLine(exchange, line_type, int(split[1]), split[2], None)
+
+def _make_line_without_channel(line_type: LineType, exchange: Text, split: List[Text]) -> TextLine:
+    return TextLine(exchange, line_type, int(split[1]), None, None)
+
+def _make_unknown_line(exchange: Text, split: List[Text]) -> TextLine:
+    raise RuntimeError('Unknown line type: %s' % split[0])
+
+# functions to make a line from its fields, by line type
+# line type is bound in advance, looking up enum members is not cheap
+_FILTER_LINE_MAKERS: Mapping[Text, Callable[[Text, List[Text]], TextLine]] = {
+    'msg': partial(_make_line_with_message, LineType.MESSAGE),
+    'send': partial(_make_line_with_message, LineType.SEND),
+    'start': partial(_make_line_with_channel, LineType.START),
+    'end': partial(_make_line_with_channel, LineType.END),
+    'err': partial(_make_line_without_channel, LineType.ERROR),
+}
+
+def _parse_filter_lines(lines: Iterable[Text], exchange: Text) -> Shard:
+    """Internal function to convert lines of a response from Filter HTTP Endpoint.
+
+    Each line is tokenized only once, up to the last field a line could have,
+    and converted by the function for its line type.
+    """
+    # type, timestamp and then channel and message if present
+    return [
+        _FILTER_LINE_MAKERS.get(split[0], _make_unknown_line)(exchange, split)
+        for split in (l.split('\t', 3) for l in lines)
+    ]
 
 class Snapshot(NamedTuple):
     """This dict holds a line from Snapshot HTTP Endpoint."""
@@ -184,11 +215,16 @@ def _snapshot(
     channels: List[Text],
     at: AnyDateTime,
     formt: Optional[Text],
+    validate: bool = True,
 ) -> List[Snapshot]:
-    """Internal function to call Snapshot HTTP Endpoint."""
-    # check parameter type and value
-    _check_param_exchange(exchange)
-    _check_param_channels(channels)
+    """Internal function to call Snapshot HTTP Endpoint.
+
+    Parameters are not checked if `validate` is `False`, for callers which already did.
+    """
+    if validate:
+        # check parameter type and value
+        _check_param_exchange(exchange)
+        _check_param_channels(channels)
     
     # construct query parameters
     params: MutableMapping[Text, Union[Text, List[Text]]] = {
@@ -201,22 +237,18 @@ def _snapshot(
     at_nanosec = _convert_any_date_time_to_nanosec(at)
 
     # request to HTTP Endpoint
-    res = _download(client_setting, 'snapshot/%s/%d' % (exchange, at_nanosec), params)
-    body: str = res['body']
-
-    # split by line terminator
-    lines = body.splitlines(False)
-    # prepare list to store result
-    result: List = [None] * len(lines)
-    for i in range(len(lines)):
-        split = lines[i].split('\t')
-        result[i] = Snapshot(
-            int(split[0]),
-            split[1],
-            split[2],
-        )
-
-    return result
+    res = _download(client_setting, f'snapshot/{exchange}/{at_nanosec}', params)
+
+    lines = res['lines']
+    try:
+        # timestamp, channel and snapshot, snapshot itself is never split
+        return [
+            Snapshot(int(split[0]), split[1], split[2])
+            for split in (line.split('\t', 2) for line in lines)
+        ]
+    finally:
+        # release the connection even if lines were not read to the end
+        lines.close()
 
 class HTTPModule:
     def __init__(self, client_setting: _ClientSetting):
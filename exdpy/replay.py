@@ -1,8 +1,8 @@
-from typing import Text, List, MutableMapping, Set, Mapping, Any, Optional, Iterator, Iterable, cast
-import json
+from typing import Text, List, MutableMapping, Set, Mapping, Optional, Iterator, Iterable, Tuple, cast
+from functools import lru_cache
 
 from .constants import DEFAULT_BUFFER_SIZE, CLIENT_DEFAULT_TIMEOUT
-from .common import TextLine, MappingLine, LineType, APIKey, Filter, AnyDateTime, _ClientSetting, _setup_client_setting, _check_filter, _convert_any_date_time_to_nanosec
+from .common import TextLine, MappingLine, LineType, APIKey, Filter, AnyDateTime, _ClientSetting, _setup_client_setting, _check_filter, _convert_any_date_time_to_nanosec, _json_loads
 from .raw import _RawRequestImpl
 
 
@@ -39,38 +39,54 @@ class ReplayRequest:
 
 ReplayMessageDefinition = Mapping[Text, Text]
 
+# looking up enum members costs more than a local dict lookup, bind them once
+_MESSAGE = LineType.MESSAGE
+_START = LineType.START
+
+@lru_cache(maxsize=256)
+def _find_fields_to_convert(definition: Text) -> Tuple[Text, ...]:
+    """Returns names of fields of timestamp or duration type in a definition.
+
+    Definitions repeat between requests and after every start line, they are cached.
+    """
+    defn: ReplayMessageDefinition = _json_loads(definition)
+    return tuple(name for name, field_type in defn.items() if field_type == 'timestamp' or field_type == 'duration')
+
 class _RawLineProcessor:
     def __init__(self):
-        self._defs: MutableMapping[Text, MutableMapping[Text, ReplayMessageDefinition]] = {}
+        # names of fields to convert into int, by exchange and channel
+        self._defs: MutableMapping[Text, MutableMapping[Text, Tuple[Text, ...]]] = {}
 
     def process_raw_line(self, line: TextLine) -> Optional[MappingLine]:
+        exchange, typ, timestamp, channel, message = line
         # convert only if needed to
-        if line.type == LineType.START:
-            # reset definition
-            self._defs[line.exchange] = {}
-        if line.type != LineType.MESSAGE:
+        if typ is not _MESSAGE:
+            if typ is _START:
+                # reset definition
+                self._defs[exchange] = {}
             return cast(MappingLine, line)
-        
-        exchange = line.exchange
-        # those variables are always available since type == msg
-        channel = cast(Text, line.channel)
-        message = cast(Text, line.message)
 
-        if exchange not in self._defs:
+        # channel and message are always available since type == msg
+        # typing.cast is a function call, it is avoided on this path
+        defs = self._defs.get(exchange)
+        if defs is None:
             # this is the first line for this exchange
-            self._defs[exchange] = {}
-        if channel not in self._defs[exchange]:
-            self._defs[exchange][channel] = json.loads(message)
+            defs = self._defs[exchange] = {}
+        fields = defs.get(channel)
+        if fields is None:
+            # definition is the same for all messages in the channel, find fields to convert only once
+            defs[channel] = _find_fields_to_convert(message)
             return None
 
-        msgObj = json.loads(message)
+        msgObj = _json_loads(message)
 
         # type conversion according to the received definition
-        defn: Mapping[Text, Any] = self._defs[exchange][channel]
-        for name, typ in defn.items():
-            if (typ == 'timestamp' or typ == 'duration') and msgObj[name] is not None:
-                # convert timestamp type parameter into int
-                msgObj[name] = int(msgObj[name], base=10)
+        for name in fields:
+            value = msgObj[name]
+            if value is not None:
+                # convert timestamp and duration type parameter into int
+                # with base given, a value not sent as string is rejected with TypeError
+                msgObj[name] = int(value, 10)
 
         # exchange: Text
         ## type: LineType
@@ -79,59 +95,40 @@ class _RawLineProcessor:
         # message: Mapping
         return MappingLine(
             exchange,
-            line.type,
-            line.timestamp,
-            line.channel,
+            typ,
+            timestamp,
+            channel,
             msgObj,
         )
 
 class _ReplayStreamIterator(Iterator[MappingLine]):
     def __init__(self,
-        client_setting: _ClientSetting,
-        filt: Filter,
-        start: int,
-        end: int,
+        raw_request: _RawRequestImpl,
         buffer_size: int,
     ):
-        self._setting = client_setting
-        req = _RawRequestImpl(
-            client_setting,
-            filt,
-            start,
-            end,
-            'json',
-        )
-        self._raw_itr: Iterator[TextLine] = iter(req.stream(buffer_size))
+        self._raw_itr: Iterator[TextLine] = iter(raw_request.stream(buffer_size))
         self._processor = _RawLineProcessor()
+        # bound once, not looked up for every line
+        self._process_raw_line = self._processor.process_raw_line
 
-    def __next__(self):
-        while True:
-            try:
-                line = next(self._raw_itr)
-            except StopIteration:
-                raise StopIteration
-
-            processed = self._processor.process_raw_line(line)
-            if processed is None:
-                continue
-            return processed
+    def __next__(self) -> MappingLine:
+        process_raw_line = self._process_raw_line
+        for line in self._raw_itr:
+            processed = process_raw_line(line)
+            if processed is not None:
+                return processed
+        raise StopIteration
 
 class _ReplayStreamIterable(Iterable[MappingLine]):
     def __init__(self,
-        client_setting: _ClientSetting,
-        filt: Filter,
-        start: int,
-        end: int,
+        raw_request: _RawRequestImpl,
         buffer_size: int,
     ):
-        self._setting = client_setting
-        self._filter = filt
-        self._start = start
-        self._end = end
+        self._raw_request = raw_request
         self._buffer_size = buffer_size
 
-    def __iter__(self):
-        return _ReplayStreamIterator(self._setting, self._filter, self._start, self._end, self._buffer_size)
+    def __iter__(self) -> Iterator[MappingLine]:
+        return _ReplayStreamIterator(self._raw_request, self._buffer_size)
 
 
 class _ReplayRequestImpl(ReplayRequest):
@@ -141,36 +138,29 @@ class _ReplayRequestImpl(ReplayRequest):
         start: AnyDateTime,
         end: AnyDateTime,
     ):
-        self._setting = client_setting
         _check_filter(filt, 'filt')
-        self._filter = filt
-        self._start = _convert_any_date_time_to_nanosec(start)
-        self._end = _convert_any_date_time_to_nanosec(end)
-        if self._start >= self._end:
+        start_nanosec = _convert_any_date_time_to_nanosec(start)
+        end_nanosec = _convert_any_date_time_to_nanosec(end)
+        if start_nanosec >= end_nanosec:
             raise ValueError('Parameter "start" cannot be equal or bigger than "end"')
-    
-    def download(self) -> List[MappingLine]:
-        req = _RawRequestImpl(
-            self._setting,
-            self._filter,
-            self._start,
-            self._end,
+        # raw request is the same for every download and stream, it is made only once
+        self._raw_request = _RawRequestImpl(
+            client_setting,
+            filt,
+            start_nanosec,
+            end_nanosec,
             'json',
         )
-        array = req.download()
-        result: List[MappingLine] = []
+    
+    def download(self) -> List[MappingLine]:
+        array = self._raw_request.download()
         processor = _RawLineProcessor()
 
-        for i in range(len(array)):
-            processed = processor.process_raw_line(array[i])
-            if processed is None:
-                continue
-            result.append(processed)
-            
-        return result
+        # map runs the loop in C, lines consumed by the processor are dropped
+        return [processed for processed in map(processor.process_raw_line, array) if processed is not None]
 
     def stream(self, buffer_size: int = DEFAULT_BUFFER_SIZE) -> Iterable[MappingLine]:
-        return _ReplayStreamIterator(self._setting, self._filter, self._start, self._end, buffer_size)
+        return _ReplayStreamIterable(self._raw_request, buffer_size)
 
 def replay(
     apikey: APIKey,
@@ -23,7 +23,9 @@ REQUIRED = [
 ]
 
 # What packages are optional?
-EXTRAS = {}
+EXTRAS = {
+    'speedups': ['isal', 'orjson'],
+}
 
 # The rest you shouldn't have to touch too much :)
 # ------------------------------------------------
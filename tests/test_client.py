@@ -11,3 +11,14 @@ def test_invalid_apikey():
 
 def test_create_client():
     exdpy.Client(apikey='demo')
+
+def test_apikey_with_trailing_newline():
+    with pytest.raises(ValueError):
+        exdpy.Client(apikey='demo\n')
+
+def test_int_timeout():
+    exdpy.Client(apikey='demo', timeout=10)
+
+def test_invalid_timeout():
+    with pytest.raises(TypeError):
+        exdpy.Client(apikey='demo', timeout='10')
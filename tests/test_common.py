@@ -0,0 +1,33 @@
+import pytest
+import json
+from datetime import datetime, timezone, timedelta
+from exdpy.common import _convert_any_date_time_to_nanosec, _convert_any_minute_to_minute, _json_loads
+
+def test_convert_date_time_exact():
+    assert _convert_any_date_time_to_nanosec('2020-01-01T00:00:00.123456Z') == 1577836800123456000
+    assert _convert_any_date_time_to_nanosec(datetime(2020, 1, 1, 9, tzinfo=timezone(timedelta(hours=9)))) == 1577836800000000000
+    assert _convert_any_date_time_to_nanosec(1577836800123456789) == 1577836800123456789
+
+def test_convert_minute():
+    assert _convert_any_minute_to_minute('2020-01-01 00:00:59.999999Z') == 26297280
+    assert _convert_any_minute_to_minute(datetime(2020, 1, 1, 0, 1, tzinfo=timezone.utc)) == 26297281
+
+def test_convert_bool():
+    with pytest.raises(TypeError):
+        _convert_any_date_time_to_nanosec(True)
+    with pytest.raises(TypeError):
+        _convert_any_minute_to_minute(False)
+
+def test_json_loads_fallback():
+    # orjson rejects these, they are parsed by the standard library instead
+    for text in ('{"a": NaN}', '{"a": 1e400}', '"\\ud800"'):
+        assert repr(_json_loads(text)) == repr(json.loads(text))
+
+def test_json_loads_big_int():
+    value = _json_loads('{"a": 123456789012345678901234}')['a']
+    try:
+        import orjson
+        # orjson parses integers over 64 bits into float, as documented in README
+        assert value == 1.2345678901234569e+23
+    except ImportError:
+        assert value == 123456789012345678901234
@@ -1,3 +1,7 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import pytest
+import exdpy.http
 from exdpy import Client, LineType
 
 cli = Client(apikey='demo')
@@ -17,3 +21,58 @@ def test_snapshot():
     assert type(lines[0].timestamp) == int
     assert type(lines[0].channel) == str
     assert type(lines[0].snapshot) == str
+
+def _serve(status_code: int, body: bytes, connections: set) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        def log_message(self, *args):
+            pass
+        def do_GET(self):
+            connections.add(self.client_address)
+            self.send_response(status_code)
+            self.send_header('Content-Type', 'text/plain')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except ConnectionError:
+                # client may stop reading halfway
+                pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def test_404_connection_reused(monkeypatch):
+    connections = set()
+    server = _serve(404, b'not found', connections)
+    try:
+        monkeypatch.setattr(exdpy.http, 'URL_API', 'http://127.0.0.1:%d/v1/' % server.server_address[1])
+        local = Client(apikey='demo')
+        for minute in range(5):
+            assert local.http.filter('bitmex', ['orderBookL2'], minute) == []
+        # every missing shard is served over the same connection
+        assert len(connections) == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_connection_released_on_error(monkeypatch):
+    server = _serve(200, b'unknown\t1\n' * 10000, set())
+    try:
+        url = 'http://127.0.0.1:%d/v1/' % server.server_address[1]
+        monkeypatch.setattr(exdpy.http, 'URL_API', url)
+        local = Client(apikey='demo')
+        errors = []
+        for minute in range(3):
+            with pytest.raises(RuntimeError) as excinfo:
+                local.http.filter('bitmex', ['orderBookL2'], minute)
+            # traceback keeps frames reading the response alive
+            errors.append(excinfo.value)
+        # connections are back in the pool, even though responses were not read to the end
+        pools = local._setting['session'].get_adapter(url).poolmanager.pools
+        pool = pools[next(iter(pools.keys()))]
+        assert pool.pool.qsize() == pool.pool.maxsize
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -8,6 +8,21 @@ req = cli.raw({
     '2020-01-01 00:00:00Z', 
     '2020-01-01 00:01:00Z',
 )
+req_two = cli.raw({
+        'bitmex': ['orderBookL2'],
+        'binance': ['btcusdt_trade'],
+    },
+    '2020-01-01 00:00:00Z',
+    '2020-01-01 00:01:00Z',
+)
+req_multi = cli.raw({
+        'bitmex': ['orderBookL2', 'trade'],
+        'bitflyer': ['lightning_executions_FX_BTC_JPY'],
+        'binance': ['btcusdt_trade'],
+    },
+    '2020-01-01 00:00:00Z',
+    '2020-01-01 00:05:00Z',
+)
 
 def test_raw_download():
     lines = req.download()
@@ -42,3 +57,31 @@ def test_raw_same_result():
         assert line.timestamp == downloaded[count].timestamp
         assert line.message == downloaded[count].message
         count += 1
+
+def test_raw_stream_multi_exchange():
+    # buffer is smaller than the number of shards, so shards are requested while streaming
+    exchanges = set()
+    count = 0
+    for line in req_multi.stream(2):
+        assert type(line.exchange) == str
+        assert type(line.type) == exdpy.LineType
+        assert type(line.timestamp) == int
+        exchanges.add(line.exchange)
+        count += 1
+    assert count == len(req_multi.download())
+    assert exchanges == {'bitmex', 'bitflyer', 'binance'}
+
+def test_raw_download_two_exchanges():
+    lines = req_two.download()
+    assert len(lines) != 0
+    for i in range(len(lines) - 1):
+        assert lines[i].timestamp <= lines[i+1].timestamp
+    assert lines == list(req_two.stream())
+
+def test_raw_stream_order_multi_exchange():
+    # lines are ordered by timestamp, lines with the same timestamp as exchanges are in the filter
+    exchanges = ['bitmex', 'bitflyer', 'binance']
+    lines = list(req_multi.stream())
+    assert len(lines) != 0
+    for i in range(len(lines) - 1):
+        assert (lines[i].timestamp, exchanges.index(lines[i].exchange)) <= (lines[i+1].timestamp, exchanges.index(lines[i+1].exchange))
@@ -1,4 +1,6 @@
+import pytest
 import exdpy
+from exdpy.replay import _RawLineProcessor
 
 cli = exdpy.Client(apikey='demo')
 req = cli.replay({
@@ -36,3 +38,19 @@ def test_replay_stream():
     print('total of %d lines fetched', count)
 
 
+
+def test_replay_stream_twice():
+    # buffering starts on every iteration, the same iterable can be read again
+    stream = req.stream()
+    first = list(stream)
+    assert len(first) != 0
+    assert first == list(stream)
+
+def test_replay_process_non_string_field():
+    processor = _RawLineProcessor()
+    definition = exdpy.TextLine('bitmex', exdpy.LineType.MESSAGE, 0, 'trade', '{"timestamp":"timestamp"}')
+    assert processor.process_raw_line(definition) is None
+    line = processor.process_raw_line(exdpy.TextLine('bitmex', exdpy.LineType.MESSAGE, 1, 'trade', '{"timestamp":"1577836800000000000"}'))
+    assert line.message['timestamp'] == 1577836800000000000
+    with pytest.raises(TypeError):
+        processor.process_raw_line(exdpy.TextLine('bitmex', exdpy.LineType.MESSAGE, 2, 'trade', '{"timestamp":1.5}'))